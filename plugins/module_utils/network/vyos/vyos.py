@@ -28,17 +28,24 @@
 from __future__ import absolute_import, division, print_function
 
 __metaclass__ = type
+import atexit
+import base64
 import cgi
+import errno
 import json
+import select
+import socket
+import ssl
 import sys
 
-from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes, to_native, to_text
 from ansible.module_utils.basic import env_fallback
 from ansible.module_utils.connection import Connection, ConnectionError
 from ansible.module_utils.six import PY2
-from ansible.module_utils.six.moves.urllib.parse import urlencode
+from ansible.module_utils.six.moves import http_client
+from ansible.module_utils.six.moves.urllib.parse import unquote, urlencode, urlparse
+from ansible.module_utils.six.moves.urllib.request import getproxies, proxy_bypass
 from ansible.module_utils.common._collections_compat import Mapping
-from ansible.module_utils.urls import fetch_url
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.config import (
     NetworkConfig,
 )
@@ -46,8 +53,41 @@ from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.u
     to_list,
 )
 
+try:
+    from concurrent.futures import ThreadPoolExecutor, wait
+
+    HAS_THREAD_POOL = True
+except ImportError:
+    HAS_THREAD_POOL = False
+
+try:
+    import orjson
+
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 JSON_CANDIDATES = ('text', 'json', 'javascript')
+CONFIG_MODE = ('set', 'delete', 'comment')
+READ_ONLY_MODE = ('show', 'retrieve')
+TEXT_CONFIGURATION_FORMATS = ('commands', 'files', 'json')
+MAX_API_WORKERS = 8
+STALE_CONNECTION_ERRNOS = (errno.EPIPE, errno.ECONNRESET)
+API_PARAMS = (
+    'host',
+    'port',
+    'key',
+    'timeout',
+    'ca_path',
+    'validate_certs',
+    'use_proxy',
+    'client_cert',
+    'client_key',
+)
 _DEVICE_CONFIGS = {}
+_API_CONNECTIONS = {}
+_API_EXECUTOR = None
+_API_SSL_CONTEXTS = {}
 
 vyos_provider_spec = {
     "host": dict(),
@@ -234,40 +274,263 @@ def get_diff(
     return diff
 
 
-def api_command(module, mode, cmd):
-    host = module.params['host']
-    port = module.params['port']
-    key = module.params['key']
-    socket_timeout = module.params['timeout']
-    ca_path = module.params['ca_path']
-    CONFIG_MODE = ('set', 'delete', 'comment')
+def api_json_dumps(obj):
+    if HAS_ORJSON:
+        # orjson returns bytes, which urlencode quotes as they are
+        return orjson.dumps(obj)
+    return json.dumps(obj)
 
-    if mode in CONFIG_MODE:
-        uri = 'configure'
-    else:
-        uri = mode
 
-    url = "https://%s:%i/%s" % (host, port, uri)
-    r = {}
-    body_part = {"op": mode, "path": cmd['command']}
-    payload = {'data': json.dumps(body_part),
-               'key': key}
-    resp, info = fetch_url(module, url, data=urlencode(payload), headers={},
-                       method='POST', timeout=socket_timeout,
-                       ca_path=ca_path)
+def api_json_loads(content, encoding='utf-8'):
+    if HAS_ORJSON:
+        # orjson decodes the raw response bytes without a text copy first
+        return orjson.loads(content)
+    return json.loads(to_text(content, encoding=encoding))
+
+
+def api_params(module):
+    # snapshot taken once, so each request does not go back to module.params
+    return dict((name, module.params[name]) for name in API_PARAMS)
+
+
+def api_connection_key(params):
+    return (
+        params['host'],
+        params['port'],
+        params['client_cert'],
+    )
+
+
+def acquire_api_connection(module, params):
+    # idle connections are pooled per host, port and client certificate,
+    # so later requests and retries skip the TCP and TLS handshakes
+    idle = _API_CONNECTIONS.setdefault(api_connection_key(params), list())
+    try:
+        return idle.pop()
+    except IndexError:
+        return open_api_connection(module, params)
+
+
+def release_api_connection(params, conn):
+    _API_CONNECTIONS.setdefault(api_connection_key(params), list()).append(
+        conn
+    )
+
+
+def get_api_ssl_context(module, params):
+    # loading the CA bundle and client certificate is costly, build the
+    # context once per set of SSL parameters and share it
+    ca_path = params['ca_path']
+    client_cert = params['client_cert']
+    client_key = params['client_key']
+    key = (params['validate_certs'], ca_path, client_cert, client_key)
+
+    if key in _API_SSL_CONTEXTS:
+        return _API_SSL_CONTEXTS[key]
+
+    try:
+        if params['validate_certs']:
+            context = ssl.create_default_context(cafile=ca_path)
+        else:
+            context = ssl.create_default_context()
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        if client_cert:
+            context.load_cert_chain(client_cert, client_key)
+    except (IOError, ssl.SSLError) as exc:
+        module.fail_json(
+            msg="Unable to set up SSL context: %s" % to_native(exc)
+        )
+
+    _API_SSL_CONTEXTS[key] = context
+    return context
+
+
+def open_api_connection(module, params):
+    host = params['host']
+    port = params['port']
+    socket_timeout = params['timeout']
+    context = get_api_ssl_context(module, params)
+
+    proxy = None
+    if params['use_proxy'] and not proxy_bypass(host):
+        proxy = getproxies().get('https')
+
+    if not proxy:
+        return http_client.HTTPSConnection(
+            host, port, timeout=socket_timeout, context=context
+        )
+
+    if '://' not in proxy:
+        proxy = 'http://%s' % proxy
+    proxy = urlparse(proxy)
+    tunnel_headers = {}
+    if proxy.username:
+        credentials = '%s:%s' % (
+            unquote(proxy.username), unquote(proxy.password or '')
+        )
+        tunnel_headers['Proxy-Authorization'] = 'Basic %s' % to_native(
+            base64.b64encode(to_bytes(credentials))
+        )
+    conn = http_client.HTTPSConnection(
+        proxy.hostname, proxy.port or 80, timeout=socket_timeout,
+        context=context
+    )
+    conn.set_tunnel(host, port, headers=tunnel_headers)
+    return conn
+
+
+def close_api_connections():
+    for idle in _API_CONNECTIONS.values():
+        while idle:
+            idle.pop().close()
 
+
+atexit.register(close_api_connections)
+
+
+def api_connection_dropped(conn):
+    # nothing is readable on an idle kept-alive connection unless the
+    # device has closed it, in which case it must be reopened
+    if conn.sock is None:
+        return False
+    try:
+        return bool(select.select([conn.sock], [], [], 0)[0])
+    except (ValueError, select.error):
+        return True
+
+
+def is_stale_connection_error(exc):
+    remote_disconnected = getattr(http_client, 'RemoteDisconnected', ())
+    if isinstance(exc, remote_disconnected):
+        return True
+    return getattr(exc, 'errno', None) in STALE_CONNECTION_ERRNOS
+
+
+def api_command(module, params, uri, body_part, conn=None):
+    key = params['key']
+
+    payload = {'data': api_json_dumps(body_part),
+               'key': key}
+    headers = {'Accept': 'application/json',
+               'Content-Type': 'application/x-www-form-urlencoded'}
+
+    release = conn is None
+    if release:
+        conn = acquire_api_connection(module, params)
+
+    if api_connection_dropped(conn):
+        conn.close()
+
+    # a kept-alive connection may also be found closed while the request is
+    # being sent, in which case the device cannot have received it and it
+    # is sent once more on a new connection.  Errors once the request went
+    # out, timeouts included, are never retried: configure is not
+    # idempotent and the device may already have applied the request.
+    reused = conn.sock is not None
+    body = urlencode(payload)
     try:
+        try:
+            conn.request('POST', '/%s' % uri, body=body, headers=headers)
+        except (http_client.HTTPException, socket.error) as exc:
+            if not (reused and is_stale_connection_error(exc)):
+                raise
+            conn.close()
+            conn.request('POST', '/%s' % uri, body=body, headers=headers)
+        resp = conn.getresponse()
         content = resp.read()
-    except AttributeError:
-        # there was no content, but the error read()
-        # may have been stored in the info as 'body'
-        content = info.pop('body', '')
+    except (http_client.HTTPException, socket.error) as exc:
+        conn.close()
+        r, content = {'status': -1,
+                      'msg': 'Request failed: %s' % to_native(exc)}, ''
+    else:
+        r = dict((k.lower(), v) for k, v in resp.getheaders())
+        r.update(status=resp.status,
+                 msg='%s (%s bytes)' % (resp.reason, len(content)))
 
-    r.update(info)
+    if release:
+        release_api_connection(params, conn)
 
     return r, content
 
 
+def get_api_executor():
+    # created on first use and kept, so retries reuse the same threads
+    global _API_EXECUTOR
+
+    if _API_EXECUTOR is None:
+        _API_EXECUTOR = ThreadPoolExecutor(max_workers=MAX_API_WORKERS)
+    return _API_EXECUTOR
+
+
+def api_commands_concurrently(module, params, requests):
+    # each worker sends its share of the requests in order over its own
+    # connection, results come back in the order of the requests
+    workers = min(MAX_API_WORKERS, len(requests))
+    connections = [
+        acquire_api_connection(module, params) for i in range(workers)
+    ]
+
+    def run_worker(index):
+        conn = connections[index]
+        return [
+            api_command(module, params, uri, body_part, conn)
+            for uri, body_part in requests[index::workers]
+        ]
+
+    executor = get_api_executor()
+    futures = list()
+    results = [None] * len(requests)
+    try:
+        for index in range(workers):
+            futures.append(executor.submit(run_worker, index))
+        for index, future in enumerate(futures):
+            results[index::workers] = future.result()
+    finally:
+        # when a worker fails the others may still be using their
+        # connections, none goes back to the pool before all are done
+        wait(futures)
+        for conn in connections:
+            release_api_connection(params, conn)
+
+    return results
+
+
+def is_show_configuration(mode, path):
+    if mode != 'show' or path[:1] != ['configuration']:
+        return False
+    # 'show configuration commands' and friends select a text format
+    # rather than a configuration path
+    return len(path) == 1 or path[1] not in TEXT_CONFIGURATION_FORMATS
+
+
+def api_requests(commands, output='text'):
+    # consecutive configuration commands go to configure as one list of
+    # operations, with json output 'show configuration [path]' goes to
+    # retrieve so the configuration comes back as a dict
+    batch = list()
+    for cmd in to_list(commands):
+        if not isinstance(cmd, Mapping):
+            cmd = {"command": cmd.split()}
+
+        mode, path = cmd['command'][0], cmd['command'][1:]
+        if mode in CONFIG_MODE:
+            batch.append({"op": mode, "path": path})
+            continue
+
+        if batch:
+            yield 'configure', batch
+            batch = list()
+
+        if output == 'json' and is_show_configuration(mode, path):
+            yield 'retrieve', {"op": "showConfig", "path": path[1:]}
+        else:
+            yield mode, {"op": mode, "path": path}
+
+    if batch:
+        yield 'configure', batch
+
+
 def parse_commands(module, resp, content, direct_fail):
     uresp = {}
     content_encoding = 'utf-8'
@@ -280,10 +543,9 @@ def parse_commands(module, resp, content, direct_fail):
             if ct not in content_types:
                 content_types.append(ct)
 
-        u_content = to_text(content, encoding=content_encoding)
         if any(candidate in content_types[0] for candidate in JSON_CANDIDATES):
             try:
-                js = json.loads(u_content)
+                js = api_json_loads(content, content_encoding)
                 uresp['json'] = js
                 if int(resp['status']) != 200 and direct_fail:
                     msg = uresp['json']['error']
@@ -300,23 +562,42 @@ def parse_commands(module, resp, content, direct_fail):
     return uresp
 
 
-def run_api_commands(module, commands=None, direct_fail=True):
+def run_api_commands(
+    module, commands=None, direct_fail=True, output='text', params=None
+):
     if commands is None:
         raise ValueError("'commands' value is required")
+    if params is None:
+        params = api_params(module)
+
+    # runs of consecutive show commands do not depend on each other and
+    # are sent concurrently, everything else is sent one at a time in order
+    groups = list()
+    for request in api_requests(commands, output):
+        if groups and request[0] in READ_ONLY_MODE and (
+            groups[-1][-1][0] in READ_ONLY_MODE
+        ):
+            groups[-1].append(request)
+        else:
+            groups.append([request])
 
     responses = list()
-    for cmd in to_list(commands):
-        if not isinstance(cmd, Mapping):
-            cmd = {"command": cmd.split()}
-
-        mode = cmd['command'].pop(0)
-        resp, content = api_command(module, mode, cmd)
-        uresp = parse_commands(module, resp, content, direct_fail)
-        if uresp['json']['success']:
-            if uresp['json']['data']:
-                responses.append(uresp['json']['data'])
+    for group in groups:
+        if HAS_THREAD_POOL and len(group) > 1:
+            results = api_commands_concurrently(module, params, group)
         else:
-            responses.append(uresp['json']['error'])
+            results = [
+                api_command(module, params, uri, body_part)
+                for uri, body_part in group
+            ]
+
+        for resp, content in results:
+            uresp = parse_commands(module, resp, content, direct_fail)
+            if uresp['json']['success']:
+                if uresp['json']['data']:
+                    responses.append(uresp['json']['data'])
+            else:
+                responses.append(uresp['json']['error'])
 
     return responses
 
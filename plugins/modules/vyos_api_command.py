@@ -54,6 +54,11 @@ options:
       output from the command execution is returned to the playbook.  If the I(wait_for)
       argument is provided, the module is not returned until the condition is satisfied
       or the number of retries has been exceeded.
+    - Consecutive C(set), C(delete) and C(comment) commands are sent to the device as a
+      single configuration request and committed together.  If any of them fails, none of
+      them is applied and one error is returned for the whole group, in the position of
+      the group, so the index of later results in I(stdout) and I(wait_for) is shifted
+      accordingly.
     required: true
     type: list
     elements: raw
@@ -92,6 +97,42 @@ options:
       how long to wait before trying the command again.
     default: 1
     type: int
+  backoff:
+    description:
+    - Multiplier applied to the I(interval) after every retry that did not satisfy any
+      new conditional, so that the wait grows exponentially while the device is not
+      ready.  The wait is reset to I(interval) whenever a conditional is satisfied.
+    - When set to a value greater than C(1) a random jitter of +/-20% is added to each
+      wait.  The default of C(1) keeps the wait fixed at I(interval).
+    default: 1
+    type: float
+  interval_max:
+    description:
+    - The maximum number of seconds to wait between I(retries) when I(backoff) is greater
+      than C(1).  The cap applies to every wait after the jitter is added, including the
+      first one, so an I(interval_max) below I(interval) keeps all waits at I(interval_max).
+    - When not set the wait is unbounded and keeps growing with I(backoff), for example
+      I(backoff=2) with the default I(retries) and I(interval) waits about 8.5 minutes in total.
+    - Ignored when I(backoff) is C(1).  Must not be negative.
+    type: int
+  output:
+    description:
+    - The format of the responses.  With C(json), C(show configuration) commands, optionally
+      followed by a configuration path, are sent to the structured retrieve endpoint and
+      return the configuration as a dictionary, which I(wait_for) can then address by key,
+      for example C(result[0]['interfaces']['ethernet']['eth0']['address']).
+    - Operational show commands have no structured form in the API and are always returned as text.
+    type: str
+    default: text
+    choices:
+    - text
+    - json
+  return_lines:
+    description:
+    - Whether to also return the output of the commands split into lines as I(stdout_lines).
+    - Set to C(no) to avoid holding a second copy of large command outputs in the result.
+    type: bool
+    default: yes
   timeout:
     description:
       - The socket level timeout in seconds
@@ -149,6 +190,17 @@ EXAMPLES = """
     - show hardware cpu
     wait_for:
     - result[0] contains 'VyOS 1.3.0'
+
+- name: wait until eth0 has the expected address in the configuration
+  vyos.vyos.vyos_api_command:
+    host: vyos.lab.local
+    key: 12345
+    validate_certs: False
+    output: json
+    commands:
+    - show configuration interfaces ethernet eth0
+    wait_for:
+    - result[0]['address'] eq 192.0.2.1/24
 """
 
 RETURN = """
@@ -159,7 +211,7 @@ stdout:
   sample: ['...', '...']
 stdout_lines:
   description: The value of stdout split into a list
-  returned: always
+  returned: when return_lines is yes
   type: list
   sample: [['...', '...'], ['...'], ['...']]
 failed_conditions:
@@ -173,17 +225,19 @@ warnings:
   type: list
   sample: ['...', '...']
 """
+import random
+import re
 import time
+from collections import OrderedDict
 
 from ansible.module_utils._text import to_text
 from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.six import string_types
 from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.parsing import (
     Conditional,
 )
-from ansible_collections.ansible.netcommon.plugins.module_utils.network.common.utils import (
-    to_lines,
-)
 from ansible_collections.vyos.vyos.plugins.module_utils.network.vyos.vyos import (
+    api_params,
     run_api_commands,
 )
 from ansible_collections.vyos.vyos.plugins.module_utils.network.vyos.vyos import (
@@ -191,25 +245,78 @@ from ansible_collections.vyos.vyos.plugins.module_utils.network.vyos.vyos import
 )
 
 API_COMMANDS = ['show', 'generate', 'set', 'delete', 'comment']
+API_COMMAND_RE = re.compile(r"^(?:%s)(?:\s|$)" % "|".join(API_COMMANDS))
+RESULT_INDEX_RE = re.compile(r"^result\[(\d+)\]$")
+
+
+class ApiConditional(Conditional):
+    """Conditional with a fast path for "result[N] contains 'text'"
+
+    That common form is checked directly against the text response,
+    without going through the generic lookup and operator dispatch.
+    Every other conditional is evaluated by Conditional as it is.
+    """
+
+    def __init__(self, conditional, encoding=None):
+        super(ApiConditional, self).__init__(conditional, encoding)
+
+        self.index = self.literal = None
+        match = RESULT_INDEX_RE.match(self.key)
+        if self.func == self.contains and match:
+            try:
+                self.literal = str(self.value)
+            except UnicodeError:
+                pass
+            else:
+                self.index = int(match.group(1))
+
+    def __call__(self, data):
+        if self.index is not None:
+            try:
+                response = data[self.index]
+            except (IndexError, TypeError):
+                response = None
+            if isinstance(response, string_types):
+                return (self.literal in response) != self.negate
+        return super(ApiConditional, self).__call__(data)
+
+
+def allowed_command(module, item, check_mode, warnings):
+    if not API_COMMAND_RE.match(item):
+        msg = "'%s' - is not an allowed command" % item
+        module.fail_json(msg=msg)
+
+    if check_mode and not item.startswith("show"):
+        warnings.append(
+            "Only show commands are supported when using check mode, not "
+            "executing %s" % item
+        )
+        return False
+
+    return True
 
 
 def parse_commands(module, warnings):
     commands = module.params["commands"]
+    check_mode = module.check_mode
+    commands[:] = [
+        item for item in commands
+        if allowed_command(module, item, check_mode, warnings)
+    ]
 
-    for item in list(commands):
-        if not item.startswith(tuple(API_COMMANDS)):
-            msg = "'%s' - is not an allowed command" % item
-            module.fail_json(msg)
+    return commands
 
-        if module.check_mode:
-            if not item.startswith("show"):
-                warnings.append(
-                    "Only show commands are supported when using check mode, not "
-                    "executing %s" % item
-                )
-                commands.remove(item)
 
-    return commands
+def cap_interval(delay, interval_max, backoff):
+    if backoff > 1 and interval_max is not None:
+        return min(delay, interval_max)
+    return delay
+
+
+def jitter(delay, backoff):
+    if backoff > 1:
+        return delay * random.uniform(0.8, 1.2)
+    return delay
 
 
 def main():
@@ -228,6 +335,10 @@ def main():
         match=dict(default="all", choices=["all", "any"]),
         retries=dict(default=10, type="int"),
         interval=dict(default=1, type="int"),
+        backoff=dict(default=1, type="float"),
+        interval_max=dict(type="int"),
+        output=dict(default="text", choices=["text", "json"]),
+        return_lines=dict(default=True, type="bool"),
     )
 
     spec.update(vyos_argument_spec)
@@ -237,45 +348,73 @@ def main():
     warnings = list()
     result = {"changed": False, "warnings": warnings}
     commands = parse_commands(module, warnings)
-    wait_for = module.params["wait_for"] or list()
+    # duplicate conditionals always evaluate the same, parse each only once
+    wait_for = list(OrderedDict.fromkeys(module.params["wait_for"] or list()))
     direct_fail = False
 
     try:
-        conditionals = [Conditional(c) for c in wait_for]
+        conditionals = [ApiConditional(c) for c in wait_for]
     except AttributeError as exc:
         module.fail_json(msg=to_text(exc))
-    host = module.params['host']
-    port = module.params['port']
-    key = module.params['key']
-    socket_timeout = module.params['timeout']
-    ca_path = module.params['ca_path']
     retries = module.params["retries"]
     interval = module.params["interval"]
+    interval_max = module.params["interval_max"]
+    backoff = module.params["backoff"]
     match = module.params["match"]
+    output = module.params["output"]
+    # snapshot the connection parameters once for every retry
+    params = api_params(module)
+
+    if backoff < 1:
+        module.fail_json(msg="backoff must be 1 or greater")
+    if interval_max is not None and interval_max < 0:
+        module.fail_json(msg="interval_max must be 0 or greater")
 
-    for item in range(retries):
-        responses = run_api_commands(module, commands, direct_fail)
+    if not conditionals:
+        # nothing to wait for, run the commands once without polling
+        responses = run_api_commands(
+            module, commands, direct_fail, output, params
+        )
+    else:
+        delay = cap_interval(interval, interval_max, backoff)
+        for attempt in range(retries):
+            responses = run_api_commands(
+                module, commands, direct_fail, output, params
+            )
+            pending = len(conditionals)
 
-        for item in list(conditionals):
-            if item(responses):
-                if match == "any":
+            if match == "any":
+                if any(cond(responses) for cond in conditionals):
                     conditionals = list()
-                    break
-                conditionals.remove(item)
+            else:
+                conditionals = [
+                    cond for cond in conditionals if not cond(responses)
+                ]
 
-        if not conditionals:
-            break
+            # no need to wait once the last retry has failed
+            if not conditionals or attempt == retries - 1:
+                break
 
-        time.sleep(interval)
+            if len(conditionals) < pending:
+                delay = cap_interval(interval, interval_max, backoff)
+
+            # cap after the jitter so no wait exceeds interval_max
+            time.sleep(
+                cap_interval(jitter(delay, backoff), interval_max, backoff)
+            )
+            delay = cap_interval(delay * backoff, interval_max, backoff)
 
     if conditionals:
-        failed_conditions = [item.raw for item in conditionals]
+        failed_conditions = [cond.raw for cond in conditionals]
         msg = "One or more conditional statements have not been satisfied"
         module.fail_json(msg=msg, failed_conditions=failed_conditions)
 
-    result.update(
-        {"stdout": responses, "stdout_lines": list(to_lines(responses))}
-    )
+    result["stdout"] = responses
+    if module.params["return_lines"]:
+        result["stdout_lines"] = [
+            item.split("\n") if isinstance(item, string_types) else item
+            for item in responses
+        ]
 
     module.exit_json(**result)
 